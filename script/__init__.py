@@ -1,5 +1,49 @@
+import functools
 import json
+import struct
 
+from eth_utils import to_checksum_address
+
+# merkle_proofs.bin layout (see script/pack_merkle_proofs.py), big-endian:
+#   root (32) || entry count (2)
+#   then per entry: address (20) || amount (32) || proof_len (2) || proof (32 * proof_len)
+PACKED_HEADER = struct.Struct(">32sH")
+PACKED_ENTRY = struct.Struct(">20s32sH")
+
+@functools.cache
 def load_merkle_proofs() -> dict:
     with open("merkle_proofs.json", 'r') as file:
-        return json.load(file)
\ No newline at end of file
+        return json.load(file)
+
+@functools.cache
+def load_packed_merkle_proofs() -> dict:
+    """
+    same shape as load_merkle_proofs, but the root and proofs are already bytes
+    """
+    with open("merkle_proofs.bin", 'rb') as file:
+        blob = file.read()
+    root, count = PACKED_HEADER.unpack_from(blob)
+    offset = PACKED_HEADER.size
+    data = []
+    for _ in range(count):
+        address, amount, proof_len = PACKED_ENTRY.unpack_from(blob, offset)
+        offset += PACKED_ENTRY.size
+        proof = tuple(blob[i:i + 32] for i in range(offset, offset + 32 * proof_len, 32))
+        offset += 32 * proof_len
+        data.append(
+            {
+                "address": to_checksum_address(address),
+                "quantity": int.from_bytes(amount, "big"),
+                "proof": proof,
+            }
+        )
+    return {"root": root, "data": data}
+
+@functools.lru_cache(maxsize=None)
+def decode_proof(proof: tuple[str, ...]) -> tuple[bytes, ...]:
+    # one fromhex call for the whole proof, every level must be 32 bytes
+    levels = [x.removeprefix("0x") for x in proof]
+    if any(len(x) != 64 for x in levels):
+        raise ValueError("Every proof level must be 32 bytes")
+    blob = bytes.fromhex("".join(levels))
+    return tuple(blob[i:i + 32] for i in range(0, len(blob), 32))
@@ -2,17 +2,21 @@ import boa
 
 from src import VestedAirdrop, Token
 from moccasin.boa_tools import VyperContract
+from eth_utils import to_bytes
 
 from script import load_merkle_proofs
 
 
-def deploy() -> VyperContract:
+def deploy_token() -> VyperContract:
+    return Token.deploy()
+
+
+def deploy_airdrop(token: VyperContract) -> VyperContract:
     current_time = int(boa.env.evm.patch.timestamp)
-    token: VyperContract = Token.deploy()
     merkle_proofs = load_merkle_proofs()
     airdrop: VyperContract = VestedAirdrop.deploy(
         # merkle_root: bytes32,
-        bytes.fromhex(merkle_proofs["root"][2:]),
+        to_bytes(hexstr=merkle_proofs["root"]),
         # token: address
         token,
         # vesting_start_time: uint256,
@@ -22,6 +26,12 @@ def deploy() -> VyperContract:
     )
     # send 100k tokens to airdrop contract
     token.transfer(airdrop, 100_000 * 10**18)
+    return airdrop
+
+
+def deploy() -> VyperContract:
+    token: VyperContract = deploy_token()
+    airdrop: VyperContract = deploy_airdrop(token)
     return (token, airdrop)
 
 
@@ -0,0 +1,105 @@
+from eth_utils import keccak, to_bytes
+
+# Merkle multi-proofs for the vesting tree.
+#
+# The tree matches merkle_proofs.json: leaves are keccak256(address || amount),
+# sorted, pairs are hashed in sorted order (same as VestedAirdrop._hash_pair)
+# and an odd node at the end of a layer is promoted as is.
+#
+# A multi-proof for K leaves only carries the siblings that cannot be
+# recomputed from the other leaves (siblings(A_j) minus A_j at each depth j),
+# so overlapping paths share their hashes instead of repeating them K times.
+
+
+def leaf_hash(address: str, amount: int) -> bytes:
+    return keccak(to_bytes(hexstr=address) + amount.to_bytes(32, "big"))
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    if a < b:
+        return keccak(a + b)
+    return keccak(b + a)
+
+
+def build_layers(leaves: list[bytes]) -> list[list[bytes]]:
+    layers = [sorted(leaves)]
+    while len(layers[-1]) > 1:
+        layer = layers[-1]
+        layers.append(
+            [
+                hash_pair(layer[i], layer[i + 1]) if i + 1 < len(layer) else layer[i]
+                for i in range(0, len(layer), 2)
+            ]
+        )
+    return layers
+
+
+def multi_proof(layers: list[list[bytes]], indexes: list[int]) -> tuple[bytes, ...]:
+    """
+    build the multi-proof of the leaves at `indexes` (positions in layers[0])
+    """
+    known = set(indexes)
+    proof = []
+    for layer in layers[:-1]:
+        for i in sorted(known):
+            sibling = i ^ 1
+            if sibling < len(layer) and sibling not in known:
+                proof.append(layer[sibling])
+        known = {i // 2 for i in known}
+    return tuple(proof)
+
+
+def expand_multi_proof(
+    leaves: dict[int, bytes], proof: tuple[bytes, ...], leaf_count: int
+) -> tuple[bytes, dict[int, tuple[bytes, ...]]]:
+    """
+    recompute the root and the single-leaf proof of every leaf in `leaves`
+    (position -> leaf hash) from a multi-proof, each hash is computed once
+    """
+    if not leaves:
+        raise ValueError("Multi-proof needs at least one leaf")
+    if any(not 0 <= i < leaf_count for i in leaves):
+        raise ValueError("Leaf index out of range")
+    siblings = iter(proof)
+    nodes = [dict(leaves)]
+    size = leaf_count
+    while size > 1:
+        known = nodes[-1]
+        parents = {}
+        for i in sorted(known):
+            sibling = i ^ 1
+            if i // 2 in parents:
+                continue
+            if sibling >= size:
+                parents[i // 2] = known[i]
+                continue
+            if sibling not in known:
+                known[sibling] = next(siblings, None)
+                if known[sibling] is None:
+                    raise ValueError("Multi-proof is too short")
+            parents[i // 2] = hash_pair(known[i], known[sibling])
+        nodes.append(parents)
+        size = (size + 1) // 2
+    if next(siblings, None) is not None:
+        raise ValueError("Multi-proof is too long")
+
+    proofs = {}
+    for index in leaves:
+        path = []
+        i, size = index, leaf_count
+        for known in nodes[:-1]:
+            if i ^ 1 < size:
+                path.append(known[i ^ 1])
+            i, size = i // 2, (size + 1) // 2
+        proofs[index] = tuple(path)
+    return nodes[-1][0], proofs
+
+
+def verify_multi_proof(
+    root: bytes, leaves: dict[int, bytes], proof: tuple[bytes, ...], leaf_count: int
+) -> bool:
+    try:
+        computed_root, _ = expand_multi_proof(leaves, proof, leaf_count)
+    except ValueError:
+        return False
+    return computed_root == root
@@ -0,0 +1,32 @@
+from eth_utils import to_bytes
+
+from script import PACKED_ENTRY, PACKED_HEADER, decode_proof, load_merkle_proofs
+
+# one-time conversion of merkle_proofs.json into merkle_proofs.bin,
+# rerun it whenever merkle_proofs.json changes
+
+
+def pack_merkle_proofs(path: str = "merkle_proofs.bin") -> None:
+    merkle_proofs = load_merkle_proofs()
+    data = merkle_proofs["data"]
+    chunks = [PACKED_HEADER.pack(to_bytes(hexstr=merkle_proofs["root"]), len(data))]
+    for entry in data:
+        proof = decode_proof(tuple(entry["proof"]))
+        chunks.append(
+            PACKED_ENTRY.pack(
+                to_bytes(hexstr=entry["address"]),
+                entry["quantity"].to_bytes(32, "big"),
+                len(proof),
+            )
+        )
+        chunks.extend(proof)
+    with open(path, 'wb') as file:
+        file.write(b"".join(chunks))
+
+
+def moccasin_main() -> None:
+    pack_merkle_proofs()
+
+
+if __name__ == "__main__":
+    moccasin_main()
@@ -1,7 +1,35 @@
+import boa
 import pytest
-from script.deploy import deploy
+from script import load_packed_merkle_proofs
+from script.deploy import deploy_airdrop, deploy_token
 
-@pytest.fixture
-def vesting_system():
-    return deploy()
+# fixed vesting start so tests don't depend on the wall clock
+VESTING_START_TIME = 1_700_000_000
 
+
+@pytest.fixture(scope="session")
+def merkle_proofs_data():
+    # merkle_proofs.bin, proofs come out as bytes, no hex decoding
+    return load_packed_merkle_proofs()
+
+
+@pytest.fixture(scope="session")
+def merkle_entry(merkle_proofs_data):
+    def _merkle_entry(index: int) -> tuple[str, int, tuple[bytes, ...]]:
+        entry = merkle_proofs_data["data"][index]
+        return entry["address"], entry["quantity"], entry["proof"]
+
+    return _merkle_entry
+
+
+@pytest.fixture(scope="session")
+def token():
+    return deploy_token()
+
+
+# deployed and funded once per session, tests roll back to this state
+# through boa.env.anchor()
+@pytest.fixture(scope="session")
+def vesting_system(token):
+    boa.env.evm.patch.timestamp = VESTING_START_TIME
+    return (token, deploy_airdrop(token))
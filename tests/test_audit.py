@@ -2,26 +2,32 @@ import boa
 import pytest
 
 from boa.util.abi import Address
-from eth_utils import from_wei, to_wei
-from script import load_merkle_proofs
-from eth.constants import ZERO_ADDRESS
+from eth_utils import to_bytes
+from script import decode_proof, load_merkle_proofs
+from script.multi_proof import build_layers, expand_multi_proof, leaf_hash, multi_proof
 
 # vesting info: 31% TGE, 69% linear vesting over 3 months
 
 ONE_DAY = 60 * 60 * 24
-THIRTY_DAYS = ONE_DAY * 30
-SIXTY_DAYS = ONE_DAY * 60
 NINETY_DAYS = ONE_DAY * 90
 
-# helper functions
+WEI_PER_ETH = 10**18
+
+ZERO_ADDRESS = Address("0x" + "00" * 20)
 
+# 1st proof for testing, bound once at import
+_PROOFS = load_merkle_proofs()
+MERKLE_ROOT = to_bytes(hexstr=_PROOFS["root"])
+_ENTRY = _PROOFS["data"][0]
+USER1 = _ENTRY["address"]
+AMOUNT = _ENTRY["quantity"]
+PROOF = decode_proof(tuple(_ENTRY["proof"]))
 
-def to_wei_ether(amount: int) -> int:
-    return to_wei(amount, "ether")
+# helper functions
 
 
-def from_wei_ether(amount: int) -> int:
-    return from_wei(amount, "ether")
+def warp(timestamp: int):
+    boa.env.evm.patch.timestamp = timestamp
 
 
 def block_timestamp() -> int:
@@ -36,17 +42,38 @@ class TestAudit:
     @pytest.fixture(autouse=True)
     def setup(self, vesting_system):
         self.token, self.airdrop = vesting_system
-        self.merkle_proofs = load_merkle_proofs()
-        # load 1st proof for testing
-        self.user1 = self.merkle_proofs["data"][0]["address"]
-        self.amount = self.merkle_proofs["data"][0]["quantity"]
-        self.proof = [
-            bytes.fromhex(x[2:]) for x in self.merkle_proofs["data"][0]["proof"]
-        ]
+        self.merkle_proofs = _PROOFS
+        self.user1 = USER1
+        self.amount = AMOUNT
+        self.proof = PROOF
+        self.instant_release = (self.amount * 31) // 100
+        self.linear_vesting = (self.amount * 69) // 100
+        # contracts are deployed once per session, roll back any state change
+        with boa.env.anchor():
+            yield
+
+    def batch_claim(self, indexes: list[int]):
+        """
+        claim for every user in indexes, one tx per user
+        all proofs are expanded from a single multi-proof
+        """
+        data = self.merkle_proofs["data"]
+        hashes = [leaf_hash(x["address"], x["quantity"]) for x in data]
+        layers = build_layers(hashes)
+        # position of every leaf in the sorted tree
+        position = {leaf: i for i, leaf in enumerate(layers[0])}
+        entries = {position[hashes[i]]: data[i] for i in indexes}
+        proof = multi_proof(layers, list(entries))
+        _, proofs = expand_multi_proof(
+            {i: layers[0][i] for i in entries}, proof, len(layers[0])
+        )
+        for i, entry in entries.items():
+            self.airdrop.claim(entry["address"], entry["quantity"], proofs[i])
 
     def test_increment(self):
         assert self.token.name() == "Token"
         assert self.airdrop.token() == self.token.address
+        assert self.airdrop.merkle_root() == MERKLE_ROOT
 
     def test_set_merkle_root(self):
         # cast k "HelloEth"
@@ -60,10 +87,10 @@ class TestAudit:
         # ------------------------------------------------------------------
         #                          31% OF TOKENS
         # ------------------------------------------------------------------
-        expected_amount = self.airdrop.claimable_amount(self.user1, self.amount)
+        # claimable amount at TGE is covered by test_claimable_amount
         self.airdrop.claim(self.user1, self.amount, self.proof)
         user_balance = self.token.balanceOf(self.user1)
-        assert from_wei_ether(user_balance) == from_wei_ether(expected_amount)
+        assert user_balance == self.instant_release
 
         # ------------------------------------------------------------------
         #                        REVERT CLAIM AGAIN
@@ -72,61 +99,32 @@ class TestAudit:
             self.airdrop.claim(self.user1, self.amount, self.proof)
 
         # ------------------------------------------------------------------
-        #                             30 DAYS
-        # ------------------------------------------------------------------
-        boa.env.time_travel(THIRTY_DAYS)
-        expected_claim_amount = self.airdrop.claimable_amount(self.user1, self.amount)
-        user_prev_balance = self.token.balanceOf(self.user1)
-        user_claimed_amount = self.airdrop.claimed_amount(self.user1)
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-
-        user_balance = self.token.balanceOf(self.user1)
-        instant_release = (self.amount * 31) // 100
-        linear_vesting = (self.amount * 69) // 100
-        expected_amount = (
-            instant_release + (linear_vesting * THIRTY_DAYS) // NINETY_DAYS
-        )
-        assert expected_claim_amount == expected_amount - user_claimed_amount
-        assert user_balance == expected_claim_amount + user_prev_balance
-
-        # ------------------------------------------------------------------
-        #                             60 DAYS
-        # ------------------------------------------------------------------
-        boa.env.time_travel(THIRTY_DAYS)
-        expected_claim_amount = self.airdrop.claimable_amount(self.user1, self.amount)
-        user_prev_balance = self.token.balanceOf(self.user1)
-        user_claimed_amount = self.airdrop.claimed_amount(self.user1)
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-
-        user_balance = self.token.balanceOf(self.user1)
-        instant_release = (self.amount * 31) // 100
-        linear_vesting = (self.amount * 69) // 100
-        expected_amount = instant_release + (linear_vesting * SIXTY_DAYS) // NINETY_DAYS
-        assert expected_claim_amount == expected_amount - user_claimed_amount
-        assert user_balance == expected_claim_amount + user_prev_balance
-
+        #                      30, 60 AND 90 DAYS
         # ------------------------------------------------------------------
-        #                             90 DAYS
-        # ------------------------------------------------------------------
-        boa.env.time_travel(THIRTY_DAYS)
-        expected_claim_amount = self.airdrop.claimable_amount(self.user1, self.amount)
-        user_prev_balance = self.token.balanceOf(self.user1)
-        user_claimed_amount = self.airdrop.claimed_amount(self.user1)
-        self.airdrop.claim(self.user1, self.amount, self.proof)
+        # each claim builds on the previous ones
+        start_time = block_timestamp()
+        for days in (30, 60, 90):
+            warp(start_time + ONE_DAY * days)
+            expected_claim_amount = self.airdrop.claimable_amount(
+                self.user1, self.amount
+            )
+            user_prev_balance = self.token.balanceOf(self.user1)
+            user_claimed_amount = self.airdrop.claimed_amount(self.user1)
+            self.airdrop.claim(self.user1, self.amount, self.proof)
 
-        user_balance = self.token.balanceOf(self.user1)
-        instant_release = (self.amount * 31) // 100
-        linear_vesting = (self.amount * 69) // 100
-        expected_amount = (
-            instant_release + (linear_vesting * NINETY_DAYS) // NINETY_DAYS
-        )
-        assert expected_claim_amount == expected_amount - user_claimed_amount
+            user_balance = self.token.balanceOf(self.user1)
+            expected_amount = (
+                self.instant_release
+                + (self.linear_vesting * ONE_DAY * days) // NINETY_DAYS
+            )
+            assert expected_claim_amount == expected_amount - user_claimed_amount
+            assert user_balance == expected_claim_amount + user_prev_balance
         assert user_balance == self.amount
 
         # ------------------------------------------------------------------
         #                       CANNOT CLAIM ANYMORE
         # ------------------------------------------------------------------
-        boa.env.time_travel(THIRTY_DAYS)
+        boa.env.time_travel(ONE_DAY * 30)
         with boa.reverts(vm_error="Nothing to claim"):
             self.airdrop.claim(self.user1, self.amount, self.proof)
 
@@ -148,20 +146,12 @@ class TestAudit:
         claim at irregular time, at the end we should have full balance
         """
 
-        def claim_at(days: int):
-            boa.env.time_travel(ONE_DAY * days)
-            self.airdrop.claim(self.user1, self.amount, self.proof)
+        start_time = block_timestamp()
 
-        # claim at 1 day
-        claim_at(1)
-        # claim at 12 days
-        claim_at(11)
-        # claim at 35 days
-        claim_at(23)
-        # claim at 60 days
-        claim_at(25)
-        # claim at 892 days
-        claim_at(832)
+        # claim at 1, 12, 35, 60 and 892 days
+        for days in (1, 12, 35, 60, 892):
+            warp(start_time + ONE_DAY * days)
+            self.airdrop.claim(self.user1, self.amount, self.proof)
 
         assert self.token.balanceOf(self.user1) == self.amount
 
@@ -178,7 +168,8 @@ class TestAudit:
         with boa.reverts(vm_error="Claiming is not available yet"):
             self.airdrop.claim(self.user1, self.amount, self.proof)
 
-    def test_claimable_amount(self):
+    @pytest.mark.parametrize("days_elapsed", [30, 60, 90, 120])
+    def test_claimable_amount(self, days_elapsed: int):
         """
         claimable_amount is a view function
         we test its calculations
@@ -186,108 +177,67 @@ class TestAudit:
 
         # 31% unlocked at TGE
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei_ether(claimable) == from_wei_ether(self.amount * 31 // 100)
+        assert claimable == self.instant_release
 
-        linear_vesting = (self.amount * 69) // 100
-
-        # after 30 days
-        boa.env.time_travel(THIRTY_DAYS)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert (
-            claimable
-            == (self.amount * 31 // 100) + (linear_vesting * THIRTY_DAYS) // NINETY_DAYS
-        )
-
-        # after 60 days
-        boa.env.time_travel(THIRTY_DAYS)
+        # the view function doesn't keep track of the state,
+        # after 90 days it stays at the full self.amount
+        boa.env.time_travel(ONE_DAY * days_elapsed)
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
         assert (
             claimable
-            == (self.amount * 31 // 100)
-            + (linear_vesting * 2 * THIRTY_DAYS) // NINETY_DAYS
+            == self.instant_release
+            + (self.linear_vesting * ONE_DAY * min(days_elapsed, 90)) // NINETY_DAYS
         )
 
-        # after 90 days
-        boa.env.time_travel(THIRTY_DAYS)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == self.amount
-
-        # cannot claim anymore, but the view function doesn't keep track of the state, so it will be full self.amount
-        boa.env.time_travel(THIRTY_DAYS)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == self.amount
-
     def test_claimable_amount_with_claims(self):
         """
         check if the claimable amount is correct after multiple claims
         """
-        linear_vesting = (self.amount * 69) // 100
-
         # check if TGE is correct
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei_ether(claimable) == from_wei_ether(self.amount * 31 // 100)
+        assert claimable == self.instant_release
 
         # claim with user1
         self.airdrop.claim(self.user1, self.amount, self.proof)
         # should only get 31% of the tokens
-        assert from_wei_ether(self.token.balanceOf(self.user1)) == from_wei_ether(
-            self.amount * 31 // 100
-        )
+        assert self.token.balanceOf(self.user1) == self.instant_release
 
         # claim again, should fail because amount is 0
         with boa.reverts(vm_error="Nothing to claim"):
             self.airdrop.claim(self.user1, self.amount, self.proof)
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei_ether(claimable) == 0
-
-        # after 30 days
-        boa.env.time_travel(THIRTY_DAYS)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == (linear_vesting * THIRTY_DAYS) // NINETY_DAYS
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert from_wei_ether(self.token.balanceOf(self.user1)) == from_wei_ether(
-            (self.amount * 31 // 100) + (linear_vesting * THIRTY_DAYS) // NINETY_DAYS
-        )
-
-        # after 60 days total
-        boa.env.time_travel(THIRTY_DAYS)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == (linear_vesting * THIRTY_DAYS) // NINETY_DAYS
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert from_wei_ether(self.token.balanceOf(self.user1)) == from_wei_ether(
-            (self.amount * 31 // 100) + (linear_vesting * 60) // 90
-        )
+        assert claimable == 0
 
-        # after 90 days total
-        boa.env.time_travel(THIRTY_DAYS)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == (linear_vesting * THIRTY_DAYS) // NINETY_DAYS
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert from_wei_ether(self.token.balanceOf(self.user1)) == from_wei_ether(
-            (self.amount * 31 // 100) + (linear_vesting * 90) // 90
-        )
+        # after 30, 60 and 90 days total, only the last 30 days are claimable
+        start_time = block_timestamp()
+        for days in (30, 60, 90):
+            warp(start_time + ONE_DAY * days)
+            claimable = self.airdrop.claimable_amount(self.user1, self.amount)
+            assert claimable == (self.linear_vesting * ONE_DAY * 30) // NINETY_DAYS
+            self.airdrop.claim(self.user1, self.amount, self.proof)
+            assert self.token.balanceOf(self.user1) == (
+                self.instant_release
+                + (self.linear_vesting * ONE_DAY * days) // NINETY_DAYS
+            )
+        assert self.token.balanceOf(self.user1) == self.amount
 
         # cannot claim anymore
-        boa.env.time_travel(THIRTY_DAYS)
+        boa.env.time_travel(ONE_DAY * 30)
         with boa.reverts(vm_error="Nothing to claim"):
             self.airdrop.claim(self.user1, self.amount, self.proof)
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei_ether(claimable) == 0
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei_ether(claimable) == 0
+        assert claimable == 0
 
     def test_rescue_tokens(self):
         """
         ERC20 sent to the contract can be rescued by the owner
         """
-        amount = 1000
+        amount = 1000 * WEI_PER_ETH
         airdrop_balance = self.token.balanceOf(self.airdrop.address)
 
-        self.airdrop.rescue_tokens(self.token.address, to_wei_ether(amount))
-        assert self.token.balanceOf(
-            self.airdrop.address
-        ) == airdrop_balance - to_wei_ether(amount)
-        # assert self.token.balanceOf(boa.tx.origin) == to_wei(amount)
+        self.airdrop.rescue_tokens(self.token.address, amount)
+        assert self.token.balanceOf(self.airdrop.address) == airdrop_balance - amount
+        # assert self.token.balanceOf(boa.tx.origin) == amount
 
     def test_set_timestamp(self):
         current_time = self.airdrop.vesting_start_time()
@@ -306,7 +256,18 @@ class TestAudit:
                 self.airdrop.set_merkle_root(b"0x0")
             with boa.reverts(revert_msg):
                 self.airdrop.rescue_tokens(self.token.address, 0)
-    
+
+    def test_batch_claim(self):
+        """
+        every user claims after 90 days with proofs from one multi-proof
+        """
+        boa.env.time_travel(NINETY_DAYS)
+        indexes = list(range(len(self.merkle_proofs["data"])))
+        self.batch_claim(indexes)
+        for i in indexes:
+            entry = self.merkle_proofs["data"][i]
+            assert self.token.balanceOf(entry["address"]) == entry["quantity"]
+
     # ------------------------------------------------------------------
     #                           AUDIT TESTS
     # ------------------------------------------------------------------
@@ -314,7 +275,7 @@ class TestAudit:
         """
         claimable_amount with user address zero
         """
-        claimable = self.airdrop.claimable_amount(Address("0x" + ZERO_ADDRESS.hex()), self.amount)
+        claimable = self.airdrop.claimable_amount(ZERO_ADDRESS, self.amount)
         print(claimable)
         assert claimable == 0
     
@@ -322,14 +283,14 @@ class TestAudit:
         """
         claimable_amount with user address zero
         """
-        claimable = self.airdrop.claim(Address("0x" + ZERO_ADDRESS.hex()), self.amount, self.proof)
+        claimable = self.airdrop.claim(ZERO_ADDRESS, self.amount, self.proof)
         print(claimable)
         assert claimable == 0
 
     def test_audit_claim_timestamp_manipulation(self):
         """Test realistic timestamp manipulation within Ethereum constraints"""
         
-        initial_amount = to_wei_ether(1000)
+        initial_amount = 1000 * WEI_PER_ETH
         total_time = 90 * ONE_DAY  # 90 days vesting period
         
         # Setup initial state
@@ -341,27 +302,25 @@ class TestAudit:
         # Try to manipulate timestamp by maximum allowed (15 seconds)
         MAX_TIMESTAMP_MANIPULATION = 15  # seconds
         
-        # Simulate multiple blocks with maximum timestamp manipulation
-        for _ in range(10):  # Simulate 10 blocks of manipulation
-            # Move time forward by max allowed
-            boa.env.time_travel(MAX_TIMESTAMP_MANIPULATION)
-            
-            # Calculate manipulated amount
-            manipulated_time = block_timestamp() - start_time
-            linear_portion = (initial_amount * 69) // 100
-            expected_manipulated = expected_initial + (linear_portion * manipulated_time) // total_time
-            
-            # Verify the manipulation effect
-            actual_vested = self.airdrop.claimable_amount(self.user1, initial_amount)
-            assert actual_vested == expected_manipulated, "Manipulation should follow linear vesting schedule"
-            
-            # Try to claim with manipulated timestamp
-            if actual_vested > 0:
-                with boa.reverts("Invalid proof"):  # Should fail due to invalid merkle proof
-                    self.airdrop.claim(self.user1, initial_amount, [b"0x00"])
-        
-        # Calculate total manipulation effect
+        # Simulate 10 blocks of maximum manipulation in a single jump,
+        # vesting is linear so checking the end point is enough
         total_manipulation = MAX_TIMESTAMP_MANIPULATION * 10  # 150 seconds total
+        boa.env.time_travel(total_manipulation)
+
+        # Calculate manipulated amount
+        manipulated_time = block_timestamp() - start_time
+        linear_portion = (initial_amount * 69) // 100
+        expected_manipulated = expected_initial + (linear_portion * manipulated_time) // total_time
+
+        # Verify the manipulation effect
+        actual_vested = self.airdrop.claimable_amount(self.user1, initial_amount)
+        assert actual_vested == expected_manipulated, "Manipulation should follow linear vesting schedule"
+
+        # Try to claim with manipulated timestamp
+        with boa.reverts("Invalid proof"):  # Should fail due to invalid merkle proof
+            self.airdrop.claim(self.user1, initial_amount, [b"0x00"])
+
+        # Calculate total manipulation effect
         manipulation_percentage = (total_manipulation / total_time) * 100
         
         print(f"Total time manipulated: {total_manipulation} seconds")
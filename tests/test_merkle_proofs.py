@@ -0,0 +1,40 @@
+import pytest
+
+from eth_utils import to_bytes
+from script import decode_proof, load_merkle_proofs, load_packed_merkle_proofs
+
+
+class TestMerkleProofs:
+    def test_packed_matches_json(self):
+        """
+        merkle_proofs.bin is a copy of merkle_proofs.json,
+        regenerate it with `python -m script.pack_merkle_proofs`
+        """
+        merkle_proofs = load_merkle_proofs()
+        expected = {
+            "root": to_bytes(hexstr=merkle_proofs["root"]),
+            "data": [
+                {
+                    "address": entry["address"],
+                    "quantity": entry["quantity"],
+                    "proof": decode_proof(tuple(entry["proof"])),
+                }
+                for entry in merkle_proofs["data"]
+            ],
+        }
+        assert load_packed_merkle_proofs() == expected, (
+            "merkle_proofs.bin is out of date, run `python -m script.pack_merkle_proofs`"
+        )
+
+    @pytest.mark.parametrize(
+        "proof",
+        [
+            ("0x" + "11" * 31, "0x" + "22" * 32),
+            # 63 and 65 hex chars, same total length as two valid levels
+            ("0x" + "1" * 63, "0x" + "2" * 65),
+        ],
+        ids=["short_level", "shifted_levels"],
+    )
+    def test_decode_proof_rejects_malformed_level(self, proof: tuple[str, ...]):
+        with pytest.raises(ValueError, match="32 bytes"):
+            decode_proof(proof)
@@ -0,0 +1,86 @@
+import pytest
+
+from eth_utils import to_bytes
+from script import decode_proof, load_merkle_proofs
+from script.multi_proof import (
+    build_layers,
+    expand_multi_proof,
+    leaf_hash,
+    multi_proof,
+    verify_multi_proof,
+)
+
+_PROOFS = load_merkle_proofs()
+MERKLE_ROOT = to_bytes(hexstr=_PROOFS["root"])
+LAYERS = build_layers([leaf_hash(x["address"], x["quantity"]) for x in _PROOFS["data"]])
+LEAF_COUNT = len(LAYERS[0])
+
+
+def leaves_at(indexes: list[int]) -> dict[int, bytes]:
+    return {i: LAYERS[0][i] for i in indexes}
+
+
+class TestMultiProof:
+    def test_root_matches_merkle_proofs(self):
+        assert LAYERS[-1][0] == MERKLE_ROOT
+
+    def test_expand_matches_single_proofs(self):
+        """
+        every proof expanded from a multi-proof of all leaves is the one in the json
+        """
+        indexes = list(range(LEAF_COUNT))
+        root, proofs = expand_multi_proof(
+            leaves_at(indexes), multi_proof(LAYERS, indexes), LEAF_COUNT
+        )
+        assert root == MERKLE_ROOT
+        for entry in _PROOFS["data"]:
+            index = LAYERS[0].index(leaf_hash(entry["address"], entry["quantity"]))
+            assert proofs[index] == decode_proof(tuple(entry["proof"]))
+
+    @pytest.mark.parametrize(
+        "indexes,proof_len",
+        [
+            # 3 hashes instead of 3 single proofs of 3 levels
+            ([0, 1, 4], 3),
+            # siblings recompute each other
+            ([4, 5, 6], 1),
+            # the whole tree needs no proof at all
+            (list(range(7)), 0),
+        ],
+    )
+    def test_multi_proof_size(self, indexes: list[int], proof_len: int):
+        proof = multi_proof(LAYERS, indexes)
+        assert len(proof) == proof_len
+        assert verify_multi_proof(MERKLE_ROOT, leaves_at(indexes), proof, LEAF_COUNT)
+
+    def test_truncated_multi_proof(self):
+        indexes = [0, 1, 4]
+        proof = multi_proof(LAYERS, indexes)[:-1]
+        with pytest.raises(ValueError, match="Multi-proof is too short"):
+            expand_multi_proof(leaves_at(indexes), proof, LEAF_COUNT)
+        assert not verify_multi_proof(MERKLE_ROOT, leaves_at(indexes), proof, LEAF_COUNT)
+
+    def test_extended_multi_proof(self):
+        indexes = [0, 1, 4]
+        proof = multi_proof(LAYERS, indexes) + (MERKLE_ROOT,)
+        with pytest.raises(ValueError, match="Multi-proof is too long"):
+            expand_multi_proof(leaves_at(indexes), proof, LEAF_COUNT)
+        assert not verify_multi_proof(MERKLE_ROOT, leaves_at(indexes), proof, LEAF_COUNT)
+
+    def test_wrong_leaf(self):
+        indexes = [0, 1, 4]
+        proof = multi_proof(LAYERS, indexes)
+        leaves = leaves_at(indexes) | {0: LAYERS[0][2]}
+        assert not verify_multi_proof(MERKLE_ROOT, leaves, proof, LEAF_COUNT)
+
+    def test_no_leaves(self):
+        with pytest.raises(ValueError, match="at least one leaf"):
+            expand_multi_proof({}, (), LEAF_COUNT)
+        assert not verify_multi_proof(MERKLE_ROOT, {}, (), LEAF_COUNT)
+
+    @pytest.mark.parametrize("index", [-1, 7, 9])
+    def test_leaf_index_out_of_range(self, index: int):
+        leaves = {index: LAYERS[0][0]}
+        with pytest.raises(ValueError, match="Leaf index out of range"):
+            expand_multi_proof(leaves, (), LEAF_COUNT)
+        assert not verify_multi_proof(MERKLE_ROOT, leaves, (), LEAF_COUNT)
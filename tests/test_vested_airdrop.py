@@ -1,127 +1,116 @@
 import boa
-from datetime import datetime
 import pytest
-from script import load_merkle_proofs
+from src import VestedAirdrop
 
 # vesting info: 31% TGE, 69% linear vesting over 3 months
 
-# helper functions
+ONE_DAY = 60 * 60 * 24
+THIRTY_DAYS = ONE_DAY * 30
+NINETY_DAYS = ONE_DAY * 90
+
+WEI_PER_ETH = 10**18
 
+# merkle_proofs.json users covered by the per-user tests
+USERS_UNDER_TEST = 5
 
-def to_wei(amount: int) -> int:
-    return amount * 10**18
+# cast k "HelloEth"
+_HELLO_ETH_ROOT = bytes.fromhex(
+    "84cef39a349765463ae54b9e7060205f4075ec9abed7f7ceac12f9f266f87062"
+)
 
+# storage slot of vesting_start_time, from the compiler's storage layout
+VESTING_START_TIME_SLOT = VestedAirdrop.compiler_data.storage_layout["storage_layout"][
+    "vesting_start_time"
+]["slot"]
 
-def from_wei(amount: int) -> int:
-    return amount // 10**18
+# helper functions
 
 
 def warp(timestamp: int):
     boa.env.evm.patch.timestamp = timestamp
 
 
-def curr_time() -> int:
-    return int(datetime.now().timestamp())
-
-
 def block_timestamp() -> int:
     return boa.env.evm.patch.timestamp
 
 
-def thirty_days() -> int:
-    return 60 * 60 * 24 * 30
-
-
-def ninety_days() -> int:
-    return 60 * 60 * 24 * 90
-
-
 class TestVestingSystem:
     @pytest.fixture(autouse=True)
-    def setup(self, vesting_system):
+    def setup(self, vesting_system, merkle_entry):
         self.token, self.airdrop = vesting_system
-        self.merkle_proofs = load_merkle_proofs()
         # load 1st proof for testing
-        self.user1 = self.merkle_proofs["data"][0]["address"]
-        self.amount = self.merkle_proofs["data"][0]["quantity"]
-        self.proof = [
-            bytes.fromhex(x[2:]) for x in self.merkle_proofs["data"][0]["proof"]
-        ]
+        self.user1, self.amount, self.proof = merkle_entry(0)
+        self.instant_release = (self.amount * 31) // 100
+        self.linear_vesting = (self.amount * 69) // 100
+        self.start_time = self.airdrop.vesting_start_time()
+        # contracts are deployed once per session, roll back any state change
+        with boa.env.anchor():
+            yield
+
+    def assert_nothing_to_claim(self, user: str, amount: int):
+        # view call, cheaper than a claim that reverts with "Nothing to claim",
+        # the revert itself is covered by test_cannot_claim_twice
+        assert self.airdrop.claimable_amount(user, amount) == 0
 
     def test_increment(self):
         assert self.token.name() == "Token"
         assert self.airdrop.token() == self.token.address
 
     def test_set_merkle_root(self):
-        # cast k "HelloEth"
-        merkle_root = bytes.fromhex(
-            "84cef39a349765463ae54b9e7060205f4075ec9abed7f7ceac12f9f266f87062"
-        )
-        self.airdrop.set_merkle_root(merkle_root)
-        assert self.airdrop.merkle_root() == merkle_root
+        self.airdrop.set_merkle_root(_HELLO_ETH_ROOT)
+        assert self.airdrop.merkle_root() == _HELLO_ETH_ROOT
 
     def test_claim(self):
-        # user should get only 31% of the tokens
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        user_balance = self.token.balanceOf(self.user1)
-        expected_amount = self.amount * 31 // 100
-        assert from_wei(user_balance) == from_wei(expected_amount)
-
-        # claim again, should fail because the amount is 0
-        with boa.reverts(vm_error="Nothing to claim"):
-            self.airdrop.claim(self.user1, self.amount, self.proof)
-
-        # after 30 days
-        warp(curr_time() + thirty_days())
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-
-        user_balance = self.token.balanceOf(self.user1)
-        linear_vesting = (self.amount * 69) // 100
-        expected_amount = (self.amount * 31 // 100) + (
-            linear_vesting * thirty_days()
-        ) // ninety_days()
-        assert user_balance == expected_amount
-
-        # after 60 days total
-        warp(block_timestamp() + thirty_days())
-        self.airdrop.claim(self.user1, self.amount, self.proof)
+        claim = self.airdrop.claim
+        balance_of = self.token.balanceOf
 
-        expected_amount = (self.amount * 31 // 100) + (linear_vesting * 60) // 90
-        assert self.token.balanceOf(self.user1) == expected_amount
+        # user should get only 31% of the tokens
+        claim(self.user1, self.amount, self.proof)
+        assert balance_of(self.user1) == self.instant_release
 
-        # after 90 days total
-        warp(block_timestamp() + thirty_days())
-        self.airdrop.claim(self.user1, self.amount, self.proof)
+        # nothing left to claim right after TGE
+        self.assert_nothing_to_claim(self.user1, self.amount)
 
-        expected_amount = self.amount
-        assert self.token.balanceOf(self.user1) == expected_amount
+        # after 30, 60 and 90 days total
+        for days in (30, 60, 90):
+            warp(self.start_time + ONE_DAY * days)
+            claim(self.user1, self.amount, self.proof)
+            expected_amount = self.instant_release + (self.linear_vesting * days) // 90
+            assert balance_of(self.user1) == expected_amount
+        assert balance_of(self.user1) == self.amount
 
         # cannot claim anymore
-        warp(block_timestamp() + thirty_days())
-        with boa.reverts(vm_error="Nothing to claim"):
-            self.airdrop.claim(self.user1, self.amount, self.proof)
+        warp(block_timestamp() + THIRTY_DAYS)
+        self.assert_nothing_to_claim(self.user1, self.amount)
 
     def test_claim_all(self):
         """
         ignore the vesting, claim after 90 days directly
         should get full amount and cannot claim anymore
         """
+        claim = self.airdrop.claim
+        balance_of = self.token.balanceOf
 
-        warp(curr_time() + ninety_days())
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert self.token.balanceOf(self.user1) == self.amount
+        warp(self.start_time + NINETY_DAYS)
+        claim(self.user1, self.amount, self.proof)
+        assert balance_of(self.user1) == self.amount
 
-        with boa.reverts(vm_error="Nothing to claim"):
-            self.airdrop.claim(self.user1, self.amount, self.proof)
+        self.assert_nothing_to_claim(self.user1, self.amount)
 
     def test_claim_irregular_time(self):
         """
         claim at irregular time, at the end we should have full balance
         """
+        claim = self.airdrop.claim
+        balance_of = self.token.balanceOf
+
+        t = block_timestamp()
 
         def claim_at(days: int):
-            warp(block_timestamp() + 60 * 60 * 24 * days)
-            self.airdrop.claim(self.user1, self.amount, self.proof)
+            nonlocal t
+            t += ONE_DAY * days
+            warp(t)
+            claim(self.user1, self.amount, self.proof)
 
         # claim at 1 day
         claim_at(1)
@@ -134,11 +123,26 @@ class TestVestingSystem:
         # claim at 892 days
         claim_at(832)
 
-        assert self.token.balanceOf(self.user1) == self.amount
+        assert balance_of(self.user1) == self.amount
+
+        self.assert_nothing_to_claim(self.user1, self.amount)
 
+    def test_cannot_claim_twice(self):
+        """
+        a second claim at the same time reverts, nothing is left to claim
+        """
+        self.airdrop.claim(self.user1, self.amount, self.proof)
         with boa.reverts(vm_error="Nothing to claim"):
             self.airdrop.claim(self.user1, self.amount, self.proof)
 
+    def test_invalid_proof_checked_first(self):
+        """
+        the merkle proof is verified before anything else in claim
+        """
+        self.airdrop.claim(self.user1, self.amount, self.proof)
+        with boa.reverts(vm_error="Invalid proof"):
+            self.airdrop.claim(self.user1, self.amount, [])
+
     def test_cannot_claim_before_start(self):
         """
         users cannot claim anything before the start
@@ -148,120 +152,97 @@ class TestVestingSystem:
         with boa.reverts(vm_error="Claiming is not available yet"):
             self.airdrop.claim(self.user1, self.amount, self.proof)
 
-    def test_claimable_amount(self):
+    @pytest.mark.parametrize(
+        "elapsed_days",
+        # after the end it stays at the full amount
+        [0, 30, 60, 90, 120],
+        ids=["tge", "30_days", "60_days", "90_days", "120_days"],
+    )
+    def test_vesting_schedule(self, elapsed_days: int):
         """
-        claimable_amount is a view function
-        we test its calculations
+        claimable_amount and claim follow the schedule, 31% TGE then linear
         """
+        warp(self.start_time + ONE_DAY * elapsed_days)
+        expected_amount = (
+            self.instant_release + (self.linear_vesting * min(elapsed_days, 90)) // 90
+        )
 
-        # 31% unlocked at TGE
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei(claimable) == from_wei(self.amount * 31 // 100)
+        assert claimable == expected_amount
 
-        linear_vesting = (self.amount * 69) // 100
-        time_now = block_timestamp()
+        self.airdrop.claim(self.user1, self.amount, self.proof)
+        assert self.token.balanceOf(self.user1) == expected_amount
 
-        # after 30 days
-        warp(time_now + thirty_days())
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert (
-            claimable
-            == (self.amount * 31 // 100)
-            + (linear_vesting * thirty_days()) // ninety_days()
-        )
+    @pytest.mark.parametrize("proof_idx", range(USERS_UNDER_TEST))
+    def test_claim_per_user(self, merkle_entry, proof_idx: int):
+        """
+        each user gets 31% at TGE and the rest after 90 days with their own proof
+        """
+        user, amount, proof = merkle_entry(proof_idx)
 
-        # after 60 days
-        warp(time_now + 2 * thirty_days())
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert (
-            claimable
-            == (self.amount * 31 // 100)
-            + (linear_vesting * 2 * thirty_days()) // ninety_days()
-        )
+        self.airdrop.claim(user, amount, proof)
+        assert self.token.balanceOf(user) == (amount * 31) // 100
 
-        # after 90 days
-        warp(time_now + 3 * thirty_days())
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == self.amount
-
-        # cannot claim anymore, but the view function doesn't keep track of the state, so it will be full self.amount
-        warp(time_now + 4 * thirty_days())
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == self.amount
+        warp(self.start_time + NINETY_DAYS)
+        self.airdrop.claim(user, amount, proof)
+        assert self.token.balanceOf(user) == amount
 
     def test_claimable_amount_with_claims(self):
         """
         check if the claimable amount is correct after multiple claims
         """
-        linear_vesting = (self.amount * 69) // 100
+        claim = self.airdrop.claim
+        balance_of = self.token.balanceOf
 
         # check if TGE is correct
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei(claimable) == from_wei(self.amount * 31 // 100)
+        assert claimable == self.instant_release
 
         # claim with user1
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        # should only get 31% of the tokens
-        assert from_wei(self.token.balanceOf(self.user1)) == from_wei(
-            self.amount * 31 // 100
-        )
+        claim(self.user1, self.amount, self.proof)
 
         # claim again, should fail because amount is 0
-        with boa.reverts(vm_error="Nothing to claim"):
-            self.airdrop.claim(self.user1, self.amount, self.proof)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei(claimable) == 0
+        self.assert_nothing_to_claim(self.user1, self.amount)
 
         # after 30 days
-        warp(block_timestamp() + thirty_days())
+        warp(block_timestamp() + THIRTY_DAYS)
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == (linear_vesting * thirty_days()) // ninety_days()
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert from_wei(self.token.balanceOf(self.user1)) == from_wei(
-            (self.amount * 31 // 100)
-            + (linear_vesting * thirty_days()) // ninety_days()
-        )
+        assert claimable == (self.linear_vesting * THIRTY_DAYS) // NINETY_DAYS
+        claim(self.user1, self.amount, self.proof)
 
         # after 60 days total
-        warp(block_timestamp() + thirty_days())
+        warp(block_timestamp() + THIRTY_DAYS)
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == (linear_vesting * thirty_days()) // ninety_days()
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert from_wei(self.token.balanceOf(self.user1)) == from_wei(
-            (self.amount * 31 // 100) + (linear_vesting * 60) // 90
-        )
+        assert claimable == (self.linear_vesting * THIRTY_DAYS) // NINETY_DAYS
+        claim(self.user1, self.amount, self.proof)
 
         # after 90 days total
-        warp(block_timestamp() + thirty_days())
+        warp(block_timestamp() + THIRTY_DAYS)
         claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert claimable == (linear_vesting * thirty_days()) // ninety_days()
-        self.airdrop.claim(self.user1, self.amount, self.proof)
-        assert from_wei(self.token.balanceOf(self.user1)) == from_wei(self.amount)
+        assert claimable == (self.linear_vesting * THIRTY_DAYS) // NINETY_DAYS
+        claim(self.user1, self.amount, self.proof)
+        # every claim above transferred exactly the claimable amount
+        assert balance_of(self.user1) == self.amount
 
         # cannot claim anymore
-        warp(block_timestamp() + thirty_days())
-        with boa.reverts(vm_error="Nothing to claim"):
-            self.airdrop.claim(self.user1, self.amount, self.proof)
-        claimable = self.airdrop.claimable_amount(self.user1, self.amount)
-        assert from_wei(claimable) == 0
+        warp(block_timestamp() + THIRTY_DAYS)
+        self.assert_nothing_to_claim(self.user1, self.amount)
 
     def test_rescue_tokens(self):
         """
         ERC20 sent to the contract can be rescued by the owner
         """
-        amount = 1000
+        amount = 1000 * WEI_PER_ETH
         airdrop_balance = self.token.balanceOf(self.airdrop.address)
 
-        self.airdrop.rescue_tokens(self.token.address, to_wei(amount))
-        assert self.token.balanceOf(self.airdrop.address) == airdrop_balance - to_wei(
-            amount
-        )
-        # assert self.token.balanceOf(boa.tx.origin) == to_wei(amount)
+        self.airdrop.rescue_tokens(self.token.address, amount)
+        assert self.token.balanceOf(self.airdrop.address) == airdrop_balance - amount
+        # assert self.token.balanceOf(boa.tx.origin) == amount
 
     def test_set_timestamp(self):
         current_time = self.airdrop.vesting_start_time()
         assert current_time != 0
-        self.airdrop.eval("self.vesting_start_time = 0")
+        boa.env.set_storage(self.airdrop.address, VESTING_START_TIME_SLOT, 0)
         assert self.airdrop.vesting_start_time() == 0
 
     def test_ownable_functions(self):
@@ -270,8 +251,11 @@ class TestVestingSystem:
         """
         user = boa.env.generate_address("user")
         revert_msg = "Only owner can call this function"
+        ownable_calls = [
+            (self.airdrop.set_merkle_root, (b"0x0",)),
+            (self.airdrop.rescue_tokens, (self.token.address, 0)),
+        ]
         with boa.env.prank(user):
-            with boa.reverts(revert_msg):
-                self.airdrop.set_merkle_root(b"0x0")
-            with boa.reverts(revert_msg):
-                self.airdrop.rescue_tokens(self.token.address, 0)
+            for fn, args in ownable_calls:
+                with boa.reverts(revert_msg):
+                    fn(*args)